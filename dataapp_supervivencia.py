@@ -5,11 +5,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
+import altair as alt
 from lifelines import KaplanMeierFitter
 import warnings
+import os
+from functools import lru_cache
 
-warnings.filterwarnings('ignore')
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Configuración de la página
 st.set_page_config(
@@ -19,12 +24,58 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data
+RUTA_EXCEL = "linelist_case_data.xlsx"
+RUTA_PARQUET = "linelist_case_data.parquet"
+
+# Estilo común de las figuras de Matplotlib (se aplica una sola vez)
+plt.rcParams['axes.grid'] = True
+plt.rcParams['grid.alpha'] = 0.3
+
+# Colores de los gráficos
+COLOR_DISTRIBUCION_EDAD = '#87CEEB'
+COLOR_SCORE = '#FA8072'
+COLORES_MORTALIDAD_EDAD = ['#FF6B6B', '#4ECDC4', '#2E86AB', '#FFD166']
+COLORES_MORTALIDAD_CLUSTER = ['#FF6B6B', '#4ECDC4', '#FFD166', '#2E86AB']
+
+# Grupos de edad: límites superiores de cada tramo y su etiqueta por código
+GRUPOS_EDAD_LIMITES = np.array([18, 40, 60, 100])
+GRUPOS_EDAD_ETIQUETAS = np.array(['0-17', '18-39', '40-59', '60+'])
+
+def convertir_excel_a_parquet():
+    """Leer el Excel una sola vez y guardarlo en Parquet para las siguientes cargas"""
+    base = pd.read_excel(RUTA_EXCEL, sheet_name="linelist_case_data")
+    
+    # Parquet exige un tipo por columna: normalizar columnas con tipos mezclados
+    for columna in base.select_dtypes(include='object').columns:
+        valores = base[columna].dropna()
+        if not valores.map(type).eq(str).all():
+            base[columna] = base[columna].map(lambda v: v if pd.isna(v) else str(v))
+    
+    try:
+        base.to_parquet(RUTA_PARQUET, engine="pyarrow")
+    except OSError as e:
+        st.warning(f"⚠️ No se pudo guardar la caché Parquet: {e}")
+    return base
+
+@st.cache_resource
 def cargar_datos():
-    """Cargar datos REALES desde el archivo Excel"""
+    """Cargar datos REALES (Parquet si ya existe, si no desde el archivo Excel).
+    
+    La base se comparte entre sesiones sin copiarse (st.cache_resource), así que
+    es de sólo lectura: las columnas derivadas se crean en procesar_datos o,
+    si sólo las usa una vista, en las funciones asegurar_*.
+    """
     try:
         # Ruta RELATIVA - el archivo está en el mismo repositorio
-        base = pd.read_excel("linelist_case_data.xlsx", sheet_name="linelist_case_data")
+        # Sin el Excel, la caché Parquet se usa tal cual
+        parquet_vigente = os.path.exists(RUTA_PARQUET) and (
+            not os.path.exists(RUTA_EXCEL)
+            or os.path.getmtime(RUTA_PARQUET) >= os.path.getmtime(RUTA_EXCEL)
+        )
+        if parquet_vigente:
+            base = pd.read_parquet(RUTA_PARQUET, engine="pyarrow")
+        else:
+            base = convertir_excel_a_parquet()
         st.success(f"✅ Datos reales cargados: {len(base)} registros")
         return procesar_datos(base)
         
@@ -35,48 +86,87 @@ def cargar_datos():
 
 def procesar_datos(base):
     """Procesar los datos para el análisis"""
+    # Un único generador para todas las columnas sintéticas
+    rng = np.random.default_rng(0)
+    n = len(base)
+    
     # Crear variable de mortalidad si no existe
     if 'outcome' in base.columns:
         base['mortalidad'] = (base['outcome'] == 'Death').astype(int)
     else:
-        base['mortalidad'] = np.random.choice([0, 1], len(base), p=[0.8, 0.2])
+        base['mortalidad'] = (rng.random(n) < 0.2).astype(np.int8)
     
     # Asegurar que existe age_years
     if 'age_years' not in base.columns:
         if 'age' in base.columns:
             base['age_years'] = base['age']
         else:
-            base['age_years'] = np.random.randint(18, 80, len(base))
+            base['age_years'] = rng.integers(18, 80, n, dtype=np.int16)
     
     # Crear BMI calculado si no existe
     if 'bmi_calculado' not in base.columns:
-        base['bmi_calculado'] = np.random.uniform(18, 35, len(base))
+        base['bmi_calculado'] = rng.uniform(18, 35, n)
     
     # Crear Conteo de Células Sanguíneas si no existe
     if 'ct_blood' not in base.columns:
-        base['ct_blood'] = np.random.uniform(16, 26, len(base))
+        base['ct_blood'] = rng.uniform(16, 26, n)
     
-    # Asegurar columnas de síntomas
+    # Asegurar columnas de síntomas (códigos int8 en lugar de cadenas 'yes'/'no')
     sintomas = ['fever', 'cough', 'chills', 'aches', 'vomit']
     for sintoma in sintomas:
         if sintoma not in base.columns:
-            base[sintoma] = np.random.choice(['yes', 'no'], len(base), p=[0.6, 0.4])
+            codigos = (rng.random(n) < 0.6).astype(np.int8)
+            base[sintoma] = pd.Categorical.from_codes(codigos, categories=['no', 'yes'])
     
     # Asegurar columna de género
     if 'gender' not in base.columns:
-        base['gender'] = np.random.choice(['m', 'f'], len(base))
-    
-    # Crear grupos de edad
-    bins = [0, 18, 40, 60, 100]
-    labels = ['0-17', '18-39', '40-59', '60+']
-    base['grupo_edad'] = pd.cut(base['age_years'], bins=bins, labels=labels, right=False)
-    
-    # Crear clusters si no existen
-    if 'cluster' not in base.columns:
-        base['cluster'] = np.random.choice([0, 1, 2, 3], len(base))
+        codigos = rng.integers(0, 2, n, dtype=np.int8)
+        base['gender'] = pd.Categorical.from_codes(codigos, categories=['f', 'm'])
+    
+    # Crear grupos de edad como código int8 (-1 = edad faltante o fuera de rango)
+    edades = base['age_years'].to_numpy(dtype=float, na_value=np.nan)
+    codigos = np.digitize(edades, GRUPOS_EDAD_LIMITES)
+    codigos[np.isnan(edades) | (edades < 0) | (codigos >= len(GRUPOS_EDAD_ETIQUETAS))] = -1
+    base['grupo_edad_code'] = codigos.astype(np.int8)
+    
+    # Reducir tipos numéricos: menos bytes en cada groupby/histograma
+    edades = base['age_years']
+    edades_enteras = edades.notna().all() and (edades % 1 == 0).all()
+    base = base.astype({
+        'age_years': 'int16' if edades_enteras else 'float32',
+        'bmi_calculado': 'float32',
+        'ct_blood': 'float32',
+        'mortalidad': 'int8',
+    })
     
     return base
 
+# Columnas propias de una sola vista: se generan al abrir esa vista, no al cargar
+@st.cache_resource
+def asegurar_clusters(_base, clave_datos):
+    """Columnas de la vista de segmentación, creando `cluster` si no existe"""
+    if 'cluster' in _base.columns:
+        # Códigos int8 válidos; faltantes, no enteros o fuera de rango pasan a -1
+        valores = pd.to_numeric(_base['cluster'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        validos = (valores % 1 == 0) & (valores >= 0) & (valores <= np.iinfo(np.int8).max)
+        cluster = np.where(validos, valores, -1).astype(np.int8)
+    else:
+        cluster = np.random.default_rng(0).integers(0, 4, len(_base), dtype=np.int8)
+    return pd.DataFrame({
+        'age_years': _base['age_years'],
+        'mortalidad': _base['mortalidad'],
+        'cluster': cluster,
+    })
+
+@st.cache_resource
+def asegurar_supervivencia(_base, clave_datos):
+    """Columnas de la vista de supervivencia con tiempos de ejemplo (fijos entre reruns)"""
+    tiempo = np.random.default_rng(42).exponential(30, len(_base)).astype(np.float32)
+    return pd.DataFrame({
+        'tiempo_supervivencia': tiempo,
+        'mortalidad': _base['mortalidad'],
+    })
+
 def crear_datos_ejemplo():
     """Crear datos de ejemplo si no se puede cargar el archivo"""
     np.random.seed(42)
@@ -99,99 +189,268 @@ def crear_datos_ejemplo():
     base = pd.DataFrame(datos)
     return procesar_datos(base)
 
+# Tablas del score de riesgo: umbrales ordenados y puntos por tramo.
+# np.searchsorted(umbrales, x, side='right') devuelve el tramo de x, de modo
+# que puntos[tramo] reproduce la escalera de if/elif sin ramas.
+EDAD_UMBRALES = np.array([18, 40, 60])
+EDAD_PUNTOS = np.array([0.0, 1.0, 2.0, 3.0])
+
+CT_BLOOD_UMBRALES = np.array([20, 22, 24])
+CT_BLOOD_PUNTOS = np.array([2.5, 1.5, 0.5, 0.0])
+
+# BMI puntúa con "> 30" y "> 35" (estrictos), de ahí el nextafter
+BMI_UMBRALES = np.array([18.5, np.nextafter(30, np.inf), np.nextafter(35, np.inf)])
+BMI_PUNTOS = np.array([1.0, 0.0, 1.0, 2.0])
+
+TEMPERATURA_UMBRALES = np.array([37.5, 38.0, 38.5])
+TEMPERATURA_PUNTOS = np.array([0.0, 1.0, 1.5, 2.0])
+
+SATURACION_UMBRALES = np.array([90, 93, 95])
+SATURACION_PUNTOS = np.array([3.0, 2.0, 1.0, 0.0])
+
+# Variables categóricas: opción del formulario -> código -> puntos
+GENERO_CODIGOS = {"Femenino": 0, "Masculino": 1}
+GENERO_PUNTOS = np.array([0.0, 0.5])
+
+TOS_CODIGOS = {"Ninguna": 0, "Leve": 1, "Moderada": 2, "Severa": 3}
+TOS_PUNTOS = np.array([0.0, 0.5, 1.0, 1.5])
+
+ESCALOFRIOS_CODIGOS = {"No": 0, "Sí": 1}
+ESCALOFRIOS_PUNTOS = np.array([0.0, 0.8])
+
+DOLORES_CODIGOS = {"Ninguno": 0, "Leves": 1, "Moderados": 2, "Severos": 3}
+DOLORES_PUNTOS = np.array([0.0, 0.4, 0.8, 1.2])
+
+VOMITOS_CODIGOS = {"No": 0, "Sí": 1}
+VOMITOS_PUNTOS = np.array([0.0, 0.7])
+
+RESPIRATORIA_CODIGOS = {"Ninguna": 0, "Leve": 1, "Moderada": 2, "Severa": 3}
+RESPIRATORIA_PUNTOS = np.array([0.0, 0.8, 1.5, 2.5])
+
+def puntos_por_umbral(valores, umbrales, puntos):
+    """Puntos del tramo en que cae cada valor (los valores faltantes suman 0)"""
+    valores = np.asarray(valores, dtype=float)
+    tramo = np.searchsorted(umbrales, valores, side='right')
+    return np.where(np.isnan(valores), 0.0, puntos[tramo])
+
 def calcular_score_riesgo(edad, ct_blood, bmi, genero, temperatura, tos, escalofrios, dolores, vomitos, dificultad_respiratoria, saturacion_oxigeno):
-    """Calcula score de riesgo basado en el modelo entrenado"""
-    score = 0
-    
-    # Edad
-    if edad >= 60:
-        score += 3.0
-    elif edad >= 40:
-        score += 2.0
-    elif edad >= 18:
-        score += 1.0
-    
-    # Conteo de Células Sanguíneas
-    if ct_blood < 20:
-        score += 2.5
-    elif ct_blood < 22:
-        score += 1.5
-    elif ct_blood < 24:
-        score += 0.5
-    
-    # BMI
-    if bmi > 35:
-        score += 2.0
-    elif bmi > 30:
-        score += 1.0
-    elif bmi < 18.5:
-        score += 1.0
-    
-    # Género
-    if genero == 'Masculino':
-        score += 0.5
+    """Calcula score de riesgo basado en el modelo entrenado.
+    
+    Los valores continuos se cuantizan a la resolución de los sliders (años
+    enteros y décimas) para que entradas equivalentes compartan la caché.
+    """
+    return _calcular_score_riesgo_cuantizado(
+        int(round(edad)), round(ct_blood * 10), round(bmi * 10), genero,
+        round(temperatura * 10), tos, escalofrios, dolores, vomitos,
+        dificultad_respiratoria, round(saturacion_oxigeno * 10)
+    )
+
+@lru_cache(maxsize=2048)
+def _calcular_score_riesgo_cuantizado(edad, ct_blood_x10, bmi_x10, genero, temperatura_x10, tos, escalofrios, dolores, vomitos, dificultad_respiratoria, saturacion_x10):
+    score = (
+        puntos_por_umbral(edad, EDAD_UMBRALES, EDAD_PUNTOS)
+        + puntos_por_umbral(ct_blood_x10 / 10, CT_BLOOD_UMBRALES, CT_BLOOD_PUNTOS)
+        + puntos_por_umbral(bmi_x10 / 10, BMI_UMBRALES, BMI_PUNTOS)
+        + GENERO_PUNTOS[GENERO_CODIGOS.get(genero, 0)]
+        + puntos_por_umbral(temperatura_x10 / 10, TEMPERATURA_UMBRALES, TEMPERATURA_PUNTOS)
+        + TOS_PUNTOS[TOS_CODIGOS.get(tos, 0)]
+        + ESCALOFRIOS_PUNTOS[ESCALOFRIOS_CODIGOS.get(escalofrios, 0)]
+        + DOLORES_PUNTOS[DOLORES_CODIGOS.get(dolores, 0)]
+        + VOMITOS_PUNTOS[VOMITOS_CODIGOS.get(vomitos, 0)]
+        + RESPIRATORIA_PUNTOS[RESPIRATORIA_CODIGOS.get(dificultad_respiratoria, 0)]
+        + puntos_por_umbral(saturacion_x10 / 10, SATURACION_UMBRALES, SATURACION_PUNTOS)
+    )
     
-    # Síntomas
-    if temperatura >= 38.5:
-        score += 2.0
-    elif temperatura >= 38.0:
-        score += 1.5
-    elif temperatura >= 37.5:
-        score += 1.0
-    
-    if tos == "Severa":
-        score += 1.5
-    elif tos == "Moderada":
-        score += 1.0
-    elif tos == "Leve":
-        score += 0.5
-    
-    if escalofrios == "Sí":
-        score += 0.8
-    
-    if dolores == "Severos":
-        score += 1.2
-    elif dolores == "Moderados":
-        score += 0.8
-    elif dolores == "Leves":
-        score += 0.4
-    
-    if vomitos == "Sí":
-        score += 0.7
-    
-    if dificultad_respiratoria == "Severa":
-        score += 2.5
-    elif dificultad_respiratoria == "Moderada":
-        score += 1.5
-    elif dificultad_respiratoria == "Leve":
-        score += 0.8
-    
-    if saturacion_oxigeno < 90:
-        score += 3.0
-    elif saturacion_oxigeno < 93:
-        score += 2.0
-    elif saturacion_oxigeno < 95:
-        score += 1.0
-    
-    return round(score, 2)
+    return round(float(score), 2)
+
+def calcular_score_riesgo_batch(base):
+    """Calcula el score de riesgo de toda la cohorte columna a columna.
+    
+    Usa las columnas de la base de casos: los síntomas sólo se registran como
+    'yes'/'no', así que un 'yes' en tos o dolores puntúa como el nivel leve.
+    La dificultad respiratoria y la saturación no se registran y no suman.
+    """
+    n = len(base)
+    
+    def columna_numerica(nombre):
+        if nombre in base.columns:
+            return base[nombre].to_numpy(dtype=float, na_value=np.nan)
+        return np.full(n, np.nan)
+    
+    def columna_si(nombre, valor='yes'):
+        if nombre in base.columns:
+            return (base[nombre] == valor).to_numpy(dtype=np.int8)
+        return np.zeros(n, dtype=np.int8)
+    
+    edad = columna_numerica('age_years')
+    ct_blood = columna_numerica('ct_blood')
+    bmi = columna_numerica('bmi_calculado')
+    temperatura = columna_numerica('temp')
+    genero = columna_si('gender', 'm')
+    tos = columna_si('cough')
+    escalofrios = columna_si('chills')
+    dolores = columna_si('aches')
+    vomitos = columna_si('vomit')
+    
+    if njit is not None:
+        score = np.empty(n)
+        _score_kernel(edad, ct_blood, bmi, genero, temperatura, tos,
+                      escalofrios, dolores, vomitos, score)
+    else:
+        score = (
+            puntos_por_umbral(edad, EDAD_UMBRALES, EDAD_PUNTOS)
+            + puntos_por_umbral(ct_blood, CT_BLOOD_UMBRALES, CT_BLOOD_PUNTOS)
+            + puntos_por_umbral(bmi, BMI_UMBRALES, BMI_PUNTOS)
+            + GENERO_PUNTOS[genero]
+            + puntos_por_umbral(temperatura, TEMPERATURA_UMBRALES, TEMPERATURA_PUNTOS)
+            + TOS_PUNTOS[tos]
+            + ESCALOFRIOS_PUNTOS[escalofrios]
+            + DOLORES_PUNTOS[dolores]
+            + VOMITOS_PUNTOS[vomitos]
+        )
+    
+    return np.round(score, 2)
+
+if njit is not None:
+    @njit(cache=True)
+    def _puntos_nb(valor, umbrales, puntos):
+        if np.isnan(valor):
+            return 0.0
+        return puntos[np.searchsorted(umbrales, valor, side='right')]
+    
+    # Sin fastmath: asumiría que no hay NaN y los valores faltantes sumarían puntos.
+    # Sin parallel: Streamlit ejecuta el guion en un hilo secundario y la capa TBB
+    # de Numba bloquea la salida del intérprete; además sólo corre una vez por base.
+    @njit(cache=True)
+    def _score_kernel(edad, ct_blood, bmi, genero, temperatura, tos,
+                      escalofrios, dolores, vomitos, out):
+        """Versión compilada de calcular_score_riesgo_batch"""
+        for i in range(out.shape[0]):
+            out[i] = (
+                _puntos_nb(edad[i], EDAD_UMBRALES, EDAD_PUNTOS)
+                + _puntos_nb(ct_blood[i], CT_BLOOD_UMBRALES, CT_BLOOD_PUNTOS)
+                + _puntos_nb(bmi[i], BMI_UMBRALES, BMI_PUNTOS)
+                + GENERO_PUNTOS[genero[i]]
+                + _puntos_nb(temperatura[i], TEMPERATURA_UMBRALES, TEMPERATURA_PUNTOS)
+                + TOS_PUNTOS[tos[i]]
+                + ESCALOFRIOS_PUNTOS[escalofrios[i]]
+                + DOLORES_PUNTOS[dolores[i]]
+                + VOMITOS_PUNTOS[vomitos[i]]
+            )
+
+@st.cache_data
+def agregar_mortalidad(_base, clave_datos, por):
+    """Tasa de mortalidad (%) por código de grupo, calculada una vez por conjunto de datos.
+    
+    `por` debe ser una columna de códigos enteros; los negativos (faltantes) se
+    descartan y sólo se devuelven los grupos con pacientes. `_base` no se hashea
+    (el guion bajo lo excluye de la clave de caché); `clave_datos` identifica la
+    base cargada sin recorrer el DataFrame.
+    """
+    codigos = _base[por].to_numpy()
+    validos = codigos >= 0
+    codigos = codigos[validos].astype(np.intp)
+    mortalidad = _base['mortalidad'].to_numpy(dtype=np.float64)[validos]
+    
+    muertes = np.bincount(codigos, weights=mortalidad)
+    pacientes = np.bincount(codigos)
+    observados = np.flatnonzero(pacientes)
+    return pd.Series(muertes[observados] / pacientes[observados] * 100, index=observados)
+
+@st.cache_data
+def histograma(_base, clave_datos, columna, bins=20):
+    """Conteos y bordes del histograma de una columna (sin valores faltantes)"""
+    valores = _base[columna].to_numpy(dtype=float, na_value=np.nan)
+    return np.histogram(valores[~np.isnan(valores)], bins=bins)
+
+@st.cache_resource
+def ajustar_kaplan_meier(tiempos_bytes, eventos_bytes):
+    """Función de supervivencia de Kaplan-Meier con los tiempos redondeados a días.
+    
+    Recibe los arrays float64 como bytes para que la clave de caché sea barata;
+    al agrupar por día el número de tiempos únicos queda acotado.
+    """
+    tiempos = np.frombuffer(tiempos_bytes, dtype=np.float64)
+    eventos = np.frombuffer(eventos_bytes, dtype=np.float64)
+    kmf = KaplanMeierFitter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        kmf.fit(np.round(tiempos), eventos)
+    return kmf.survival_function_
+
+@st.cache_data
+def histograma_score(_base, clave_datos, bins=20):
+    """Conteos y bordes del histograma del score de riesgo de la cohorte"""
+    return np.histogram(calcular_score_riesgo_batch(_base), bins=bins)
+
+def tabla_grafico(valores, etiquetas, nombre_x, nombre_y):
+    """DataFrame listo para st.bar_chart: índice = eje X, una columna = eje Y"""
+    return pd.DataFrame({nombre_y: np.asarray(valores)},
+                        index=pd.Index(etiquetas, name=nombre_x))
+
+def grafico_mortalidad(mortalidad, etiquetas, nombre_x, colores):
+    """Barras de mortalidad (%) con un color por grupo y el valor sobre cada barra"""
+    etiquetas = [str(etiqueta) for etiqueta in etiquetas]
+    tabla = pd.DataFrame({
+        'grupo': etiquetas,
+        'mortalidad': np.asarray(mortalidad),
+        'texto': [f'{valor:.1f}%' for valor in np.asarray(mortalidad)],
+    })
+    grafico = alt.Chart(tabla).encode(
+        x=alt.X('grupo:N', sort=None, title=nombre_x, axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('mortalidad:Q', title='Mortalidad (%)'),
+    )
+    barras = grafico.mark_bar().encode(
+        color=alt.Color('grupo:N', sort=None, legend=None,
+                        scale=alt.Scale(domain=etiquetas, range=colores)),
+        tooltip=[alt.Tooltip('grupo:N', title=nombre_x), alt.Tooltip('texto:N', title='Mortalidad')],
+    )
+    valores = grafico.mark_text(baseline='bottom', dy=-3).encode(text='texto:N')
+    return barras + valores
+
+def clave_base(base):
+    """Clave estable y barata de la base compartida por cargar_datos"""
+    return (id(base), len(base))
+
+# --- GRÁFICOS ---
+# Las figuras se construyen una vez por conjunto de datos y se guardan con
+# st.cache_resource; plt.close las saca del registro global de pyplot para que
+# no se acumulen entre reruns (st.pyplot sigue pudiendo dibujarlas).
+@st.cache_resource
+def figura_edad_cluster(_base, clave_datos):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    # Un único groupby en lugar de una máscara booleana por cluster
+    edades_cluster = _base.groupby('cluster', observed=True, sort=True)['age_years']
+    etiquetas, box_data = zip(*[(cluster, edades.dropna().to_numpy())
+                                for cluster, edades in edades_cluster if cluster >= 0])
+    ax.boxplot(box_data)
+    ax.set_xticks(range(1, len(etiquetas) + 1), etiquetas)
+    ax.set_xlabel('Cluster')
+    ax.set_ylabel('Edad (años)')
+    ax.set_title('Distribución de Edad por Cluster')
+    plt.close(fig)
+    return fig
 
 # --- FUNCIONES DE LA INTERFAZ ---
 def mostrar_dashboard(base):
     st.header("📊 Dashboard Epidemiológico")
     
-    # Métricas principales
+    # Métricas principales (reducciones directas sobre los arrays de NumPy)
+    mortalidad = base['mortalidad'].to_numpy()
+    edades = base['age_years'].to_numpy(dtype=np.float32, na_value=np.nan)
+    total_pacientes = mortalidad.size
+    tasa_mortalidad = mortalidad.mean() * 100
+    edad_promedio = np.nanmean(edades)
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_pacientes = len(base)
         st.metric("Total de Pacientes", f"{total_pacientes:,}")
     
     with col2:
-        tasa_mortalidad = base['mortalidad'].mean() * 100
         st.metric("Tasa de Mortalidad", f"{tasa_mortalidad:.1f}%")
     
     with col3:
-        edad_promedio = base['age_years'].mean()
         st.metric("Edad Promedio", f"{edad_promedio:.1f} años")
     
     with col4:
@@ -200,34 +459,24 @@ def mostrar_dashboard(base):
     # Gráficos principales
     col1, col2 = st.columns(2)
     
+    # Gráficos de barras simples: se envían los datos y los dibuja el navegador
     with col1:
         st.subheader("Distribución por Edad")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        base['age_years'].hist(bins=20, ax=ax, color='skyblue', alpha=0.7)
-        ax.set_xlabel('Edad (años)')
-        ax.set_ylabel('Frecuencia')
-        ax.set_title('Distribución de Edad de los Pacientes')
-        ax.grid(True, alpha=0.3)
-        st.pyplot(fig)
+        conteos, bordes = histograma(base, clave_base(base), 'age_years')
+        st.bar_chart(tabla_grafico(conteos, bordes[:-1].round(1), 'Edad (años)', 'Frecuencia'),
+                     x_label='Edad (años)', y_label='Frecuencia', color=COLOR_DISTRIBUCION_EDAD)
     
     with col2:
         st.subheader("Mortalidad por Grupo de Edad")
-        mortalidad_edad = base.groupby('grupo_edad')['mortalidad'].mean() * 100
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.bar(mortalidad_edad.index.astype(str), mortalidad_edad.values, 
-                     color=['#FF6B6B', '#4ECDC4', '#2E86AB', '#FFD166'])
-        ax.set_xlabel('Grupo de Edad')
-        ax.set_ylabel('Mortalidad (%)')
-        ax.set_title('Tasa de Mortalidad por Grupo de Edad')
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 1,
-                   f'{height:.1f}%', ha='center', va='bottom')
-        
-        ax.grid(True, alpha=0.3, axis='y')
-        st.pyplot(fig)
+        mortalidad_edad = agregar_mortalidad(base, clave_base(base), 'grupo_edad_code')
+        st.altair_chart(grafico_mortalidad(mortalidad_edad, GRUPOS_EDAD_ETIQUETAS[mortalidad_edad.index],
+                                           'Grupo de Edad', COLORES_MORTALIDAD_EDAD))
+    
+    # Score de riesgo de toda la cohorte
+    st.subheader("Distribución del Score de Riesgo")
+    conteos, bordes = histograma_score(base, clave_base(base))
+    st.bar_chart(tabla_grafico(conteos, bordes[:-1].round(2), 'Score de Riesgo', 'Frecuencia'),
+                 x_label='Score de Riesgo', y_label='Frecuencia', color=COLOR_SCORE)
 
 def mostrar_predictor():
     st.header("🎯 Predictor de Riesgo Individual")
@@ -311,23 +560,20 @@ def mostrar_supervivencia(base):
     
     st.info("📊 Generando datos de supervivencia de ejemplo...")
     
-    base_supervivencia = base.copy()
-    base_supervivencia['tiempo_supervivencia'] = np.random.exponential(30, len(base))
-    base_supervivencia['evento_muerte'] = base_supervivencia['mortalidad']
-    
     # Curva de Kaplan-Meier
     st.subheader("Curva de Supervivencia Global")
     
-    kmf = KaplanMeierFitter()
-    kmf.fit(base_supervivencia['tiempo_supervivencia'], base_supervivencia['evento_muerte'])
+    tiempo = base['tiempo_supervivencia'].to_numpy(dtype=np.float64)
+    evento = base['mortalidad'].to_numpy(dtype=np.float64)
+    supervivencia = ajustar_kaplan_meier(tiempo.tobytes(), evento.tobytes())
     
     fig, ax = plt.subplots(figsize=(12, 6))
-    kmf.plot_survival_function(ax=ax)
+    ax.step(supervivencia.index, supervivencia.iloc[:, 0], where='post')
     ax.set_title('Curva de Supervivencia - Todos los Pacientes')
     ax.set_xlabel('Días desde Hospitalización')
     ax.set_ylabel('Probabilidad de Supervivencia')
-    ax.grid(True, alpha=0.3)
     st.pyplot(fig)
+    plt.close(fig)
 
 def mostrar_segmentacion(base):
     st.header("👥 Segmentación y Perfiles de Pacientes")
@@ -338,36 +584,17 @@ def mostrar_segmentacion(base):
     
     with col1:
         st.subheader("Mortalidad por Cluster")
-        mortalidad_cluster = base.groupby('cluster')['mortalidad'].mean() * 100
-        
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.bar(mortalidad_cluster.index, mortalidad_cluster.values, 
-                     color=['#FF6B6B', '#4ECDC4', '#FFD166', '#2E86AB'])
-        ax.set_xlabel('Cluster')
-        ax.set_ylabel('Mortalidad (%)')
-        ax.set_title('Tasa de Mortalidad por Cluster')
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 1,
-                   f'{height:.1f}%', ha='center', va='bottom')
-        
-        st.pyplot(fig)
+        mortalidad_cluster = agregar_mortalidad(base, clave_base(base), 'cluster')
+        st.altair_chart(grafico_mortalidad(mortalidad_cluster, mortalidad_cluster.index,
+                                           'Cluster', COLORES_MORTALIDAD_CLUSTER))
     
     with col2:
         st.subheader("Distribución de Edad por Cluster")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        box_data = [base[base['cluster'] == i]['age_years'] for i in base['cluster'].unique()]
-        ax.boxplot(box_data, labels=base['cluster'].unique())
-        ax.set_xlabel('Cluster')
-        ax.set_ylabel('Edad (años)')
-        ax.set_title('Distribución de Edad por Cluster')
-        ax.grid(True, alpha=0.3)
-        st.pyplot(fig)
+        st.pyplot(figura_edad_cluster(base, clave_base(base)))
 
 # --- INICIO DE LA APLICACIÓN ---
 def main():
-    # Cargar datos
+    # Cargar datos (compartidos entre sesiones: no modificar `base`)
     base = cargar_datos()
     
     # Título principal
@@ -387,9 +614,9 @@ def main():
     elif app_mode == "🎯 Predictor de Riesgo":
         mostrar_predictor()
     elif app_mode == "📈 Análisis de Supervivencia":
-        mostrar_supervivencia(base)
+        mostrar_supervivencia(asegurar_supervivencia(base, clave_base(base)))
     elif app_mode == "👥 Segmentación de Pacientes":
-        mostrar_segmentacion(base)
+        mostrar_segmentacion(asegurar_clusters(base, clave_base(base)))
 
 # Ejecutar la aplicación
 if __name__ == "__main__":